@@ -1,21 +1,43 @@
 import os
+import json
 import requests
 import time
 import threading
 import logging
 from dotenv import load_dotenv
 
+# Same decoder policy as bot_engine: orjson when installed, stdlib otherwise.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import other modules as per project structure
 from bot_engine import HowdiesBotEngine
 from plugins_loader import PluginLoader # Import PluginLoader
 from db import DatabaseManager
-from ui import start_ui_server, ui_log_queue, bot_status_event, plugins_status_event
+from ui import start_ui_server, ui_log_queue, bot_status_event, plugins_status_event, ui_log_active
 
 # --- Logging Setup for app.py ---
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s')
 app_logger = logging.getLogger('app')
 # ---------------------------------
 
+# Shared HTTP session for all Howdies REST calls. Reusing one session keeps
+# the TCP+TLS connection alive between the login POST and any later API
+# calls instead of re-handshaking per request.
+_http = requests.Session()
+
+# .env is parsed at most once per process, even if main() is re-entered
+# (e.g. from tests or a supervisor retry).
+_DOTENV_LOADED = False
+
+def _load_env_once():
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        load_dotenv()
+        _DOTENV_LOADED = True
+
 def enforce_single_session_policy():
     """
     Placeholder for strict single session enforcement.
@@ -29,7 +51,7 @@ def enforce_single_session_policy():
     pass
 
 def main():
-    load_dotenv() # Load environment variables from .env file
+    _load_env_once() # Load environment variables from .env file
 
     bot_id = os.getenv("BOT_ID")
     bot_password = os.getenv("BOT_PASSWORD")
@@ -38,22 +60,40 @@ def main():
     database_url = os.getenv("DATABASE_URL")
     ui_port = int(os.getenv("PORT", 8000)) # Default to 8000 if not set
 
-    if not all([bot_id, bot_password, default_room, master_admin_username, database_url]):
-        app_logger.error("Missing one or more required environment variables. Check your .env file.")
+    required = {
+        "BOT_ID": bot_id,
+        "BOT_PASSWORD": bot_password,
+        "DEFAULT_ROOM": default_room,
+        "MASTER_ADMIN_USERNAME": master_admin_username,
+        "DATABASE_URL": database_url,
+    }
+    missing = [name for name, value in required.items() if not value]
+    if missing:
+        app_logger.error("Missing required environment variables: %s. Check your .env file.", ", ".join(missing))
         return
 
     enforce_single_session_policy()
 
-    app_logger.info(f"Attempting to log in bot: {bot_id}")
+    # Start importing plugin modules now so the import walk overlaps the
+    # login round-trip; they are bound to the engine after login succeeds.
+    plugin_loader = PluginLoader()
+    plugin_loader.start_import_async()
+
+    app_logger.info("Attempting to log in bot: %s", bot_id)
     session_token = None
     bot_user_id = None # Initialize bot_user_id here
     try:
         # Authenticate with Howdies API
         login_url = "https://api.howdies.app/api/login"
         payload = {"username": bot_id, "password": bot_password}
-        response = requests.post(login_url, json=payload)
+        response = _http.post(login_url, json=payload, timeout=(3.05, 10))
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        login_data = response.json()
+        # Decode the raw bytes directly instead of response.json(), which
+        # round-trips bytes -> str -> json through the stdlib.
+        if orjson is not None:
+            login_data = orjson.loads(response.content)
+        else:
+            login_data = json.loads(response.content)
         session_token = login_data.get("token")
         
         # Capture bot's own ID from login response if available
@@ -66,9 +106,10 @@ def main():
         app_logger.info("Bot successfully authenticated with Howdies API.")
 
     except requests.exceptions.RequestException as e:
-        app_logger.critical(f"Howdies API login request failed: {e}")
+        app_logger.critical("Howdies API login request failed: %s", e)
         return
-    except json.JSONDecodeError:
+    except ValueError:
+        # Both json.JSONDecodeError and orjson.JSONDecodeError subclass ValueError.
         app_logger.critical("Howdies API login response was not valid JSON.")
         return
 
@@ -78,7 +119,7 @@ def main():
         db_manager.init_db() # Ensure table exists
         app_logger.info("Database initialized successfully.")
     except Exception as e:
-        app_logger.critical(f"Failed to initialize database: {e}")
+        app_logger.critical("Failed to initialize database: %s", e)
         return
 
     # Initialize Bot Engine
@@ -90,12 +131,15 @@ def main():
         master_admin_username=master_admin_username,
         db_manager=db_manager,
         ui_log_queue=ui_log_queue,
-        bot_status_event=bot_status_event
+        bot_status_event=bot_status_event,
+        bot_password=bot_password,
+        bot_username=bot_id,
+        ui_log_active=ui_log_active
     )
 
-    # Initialize Plugin Loader
-    plugin_loader = PluginLoader()
-    plugin_loader.load_plugins(bot_engine, plugins_status_event) # Pass plugin_loader_instance
+    # Bind plugins to the engine (imports were started before login)
+    plugin_loader.wait_for_import()
+    plugin_loader.bind(bot_engine, plugins_status_event)
 
     # Start Bot Engine in a separate thread
     bot_thread = threading.Thread(target=bot_engine.run, daemon=True)
@@ -103,7 +147,7 @@ def main():
     app_logger.info("Bot Engine started in a separate thread.")
 
     # Start UI in the main thread (passing plugin_loader_instance to UI)
-    app_logger.info(f"Starting UI server on port {ui_port}...")
+    app_logger.info("Starting UI server on port %s...", ui_port)
     start_ui_server(bot_engine, plugin_loader, ui_port) # UI needs bot_engine AND plugin_loader
 
     app_logger.info("Bot system shutting down.")
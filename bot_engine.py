@@ -8,21 +8,122 @@ import traceback
 import sys
 import os
 import requests
-import uuid
+import io
+import random
+import itertools
+import concurrent.futures
+import contextlib
 
 # --- Logging Setup ---
 engine_logger = logging.getLogger('bot_engine')
 engine_logger.setLevel(logging.INFO)
 
+# orjson (C implementation) parses and serializes the small WS payloads
+# several times faster than stdlib json; fall back when not installed.
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _json_dumps(obj):
+        return json.dumps(obj)
+
+# Pre-built shapes for the common outbound payloads; copying a small
+# template is cheaper than re-hashing a fresh dict literal per send.
+_TEXT_DM_TMPL = {"type": "text", "handler": "message"}
+_TEXT_ROOM_TMPL = {"type": "text", "handler": "chatroommessage"}
+_IMAGE_DM_TMPL = {"type": "image", "handler": "message"}
+_IMAGE_ROOM_TMPL = {"type": "image", "handler": "chatroommessage"}
+
+
+class _RWLock:
+    """Minimal reader-writer lock: any number of concurrent readers, one
+    exclusive writer. The user/room maps are read by every plugin callback
+    but only written by the WS state handler, so serializing readers behind
+    a plain mutex was the main contention point under event fanout."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+# The Howdies API is inconsistent about how it spells the user-id key;
+# probe the known spellings through one helper instead of repeating the
+# triple .get() chain at every call site.
+_UID_KEYS = ("userID", "userid", "id")
+
+def _extract_uid(data):
+    for k in _UID_KEYS:
+        v = data.get(k)
+        if v:
+            return v
+    return None
+
+
 class HowdiesBotEngine:
-    def __init__(self, session_token, bot_id, default_room_name, master_admin_username, db_manager, ui_log_queue, bot_status_event):
+    def __init__(self, session_token, bot_id, default_room_name, master_admin_username, db_manager, ui_log_queue, bot_status_event, bot_password=None, bot_username=None, ui_log_active=None):
         self._session_token = session_token
         self._bot_id = bot_id
-        self._bot_username = os.getenv("BOT_ID")
+        self._bot_username = bot_username if bot_username is not None else os.getenv("BOT_ID")
+        # Resolved once here so the reconnect path never re-scans os.environ.
+        self._bot_password = bot_password if bot_password is not None else os.getenv("BOT_PASSWORD")
+        self._refresh_bot_identities()
         self._default_room_name = default_room_name
+        self._default_room_name_lc = default_room_name.lower() if default_room_name else ""
+        # Resolved once the default room join succeeds; lets sends skip the
+        # name scan over _joined_rooms. Plain attribute read/write is atomic.
+        self._default_room_id = None
         self._master_admin_username = master_admin_username
         self._db_manager = db_manager
         self._ui_log_queue = ui_log_queue
+        self._ui_log_active = ui_log_active
         self._bot_status_event = bot_status_event
 
         self._ws_app = None
@@ -30,15 +131,103 @@ class HowdiesBotEngine:
         self._reconnect_attempts = 0
         self._max_reconnect_attempts = 100
 
+        # event name -> immutable tuple of callbacks. Registration happens
+        # once at plugin setup; emit() then iterates a stable snapshot with
+        # no locking and no risk of mutation mid-iteration.
         self._event_listeners = {}
+        # handler -> "event:<handler>" memo so the receive loop doesn't
+        # rebuild the same composed string for every frame.
+        self._event_names = {}
         self._user_map = {}
+        # Secondary index: str(userid) -> the same info dict stored in
+        # _user_map, so id lookups are a hash probe instead of an O(N) scan.
+        self._userid_map = {}
         self._joined_rooms = {}
+        # The hot maps get reader-writer locks so concurrent plugin lookups
+        # don't serialize each other; lock()/unlock() route those keys to the
+        # write side for backward compatibility. _locks_guard only serializes
+        # creation of new, plugin-defined named locks.
+        self._user_rwlock = _RWLock()
+        self._room_rwlock = _RWLock()
+        self._locks_guard = threading.Lock()
         self._locks = {}
         self._bot_running = True
+        # Set by stop(); lets reconnect backoff waits abort immediately
+        # instead of sleeping out their full delay.
+        self._stop_event = threading.Event()
+
+        # Shared worker pool for plugin callbacks. Spawning a fresh Thread per
+        # listener per event gets expensive under WS message bursts; a small
+        # reusable pool amortizes thread creation and bounds concurrency.
+        self._plugin_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=int(os.getenv("BOT_PLUGIN_WORKERS", 8)),
+            thread_name_prefix="plugin")
+
+        # Per-second timestamp cache for _log_to_ui.
+        self._last_log_sec = 0
+        self._last_log_ts = ""
+
+        self._current_status = "Unknown"
+
+        self._gid_counter = itertools.count(random.getrandbits(31))
+
+        # Token-bucket pacing for outbound payloads (replaces a flat 100ms
+        # sleep per send). Bursts up to BOT_SEND_BURST go out immediately;
+        # only a sustained rate above BOT_SEND_RATE msg/s has to wait.
+        self._send_rate = float(os.getenv("BOT_SEND_RATE", 10))
+        self._send_burst = float(os.getenv("BOT_SEND_BURST", 10))
+        self._send_tokens = self._send_burst
+        self._send_last = time.monotonic()
+        self._send_bucket_lock = threading.Lock()
+
+        # Outbound payloads go through a queue drained by a dedicated sender
+        # thread, so plugin threads only pay a queue put — pacing and socket
+        # writes happen off their backs, and back-to-back payloads coalesce
+        # in the TCP send buffer.
+        self._send_queue = queue.Queue(maxsize=1024)
+        self._sender_thread = None
+
+        # Inbound frames are likewise handed off: the websocket-client reader
+        # thread only enqueues raw messages and stays responsive to pings,
+        # while this thread parses and dispatches them in micro-batches.
+        self._inbound_q = queue.Queue()
+        self._dispatch_thread = None
+
+        self._start_worker_threads()
+
+        # Per-frame EVENT/EVENT_IN/EVENT_OUT logging to the UI keeps a
+        # reference to every parsed payload alive and costs a queue op per
+        # frame; opt in with BOT_VERBOSE_WS=1 when debugging traffic.
+        self._verbose_ws = os.getenv("BOT_VERBOSE_WS") == "1"
+
+        # Pooled HTTP session for uploads so repeated image posts reuse one
+        # TCP+TLS connection; the semaphore caps concurrent uploads so a
+        # GIF-happy plugin can't saturate the plugin worker pool with I/O.
+        self._http = requests.Session()
+        self._http.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=2))
+        self._upload_sem = threading.BoundedSemaphore(4)
 
         self._log_to_ui("INFO", "engine", "Bot Engine initialized.")
         self._update_bot_status("Initialized")
 
+    def _refresh_bot_identities(self):
+        # Both the int and str forms of the bot id, hashed once, so the
+        # per-message self-check is a single set probe with no str() casts.
+        # The REST login may hand us the id as a digit string while WS
+        # frames carry it numeric (the API's id shapes are untrustworthy,
+        # see _extract_uid), so cast in both directions.
+        if self._bot_id is None:
+            self._bot_id_identities = frozenset()
+        else:
+            identities = {self._bot_id, str(self._bot_id)}
+            if isinstance(self._bot_id, str) and self._bot_id.isdigit():
+                identities.add(int(self._bot_id))
+            self._bot_id_identities = frozenset(identities)
+
+    def is_self(self, user_id):
+        """True if user_id (int or str form) belongs to this bot."""
+        return user_id in self._bot_id_identities
+
     def get_session(self):
         return {
             "token": self._session_token,
@@ -47,7 +236,10 @@ class HowdiesBotEngine:
         }
 
     def _get_gid(self):
-        return str(uuid.uuid4())[:8]
+        # Correlation id for outbound payloads. A counter from a random
+        # per-boot offset is far cheaper than uuid4's urandom read + string
+        # formatting per message; next() on itertools.count is atomic.
+        return format(next(self._gid_counter) & 0xFFFFFFFF, '08x')
 
     def get_db(self):
         return self._db_manager
@@ -56,128 +248,205 @@ class HowdiesBotEngine:
         return self._master_admin_username
 
     def get_user_info(self, user_id=None, username=None):
-        self.lock("user_map")
-        try:
+        with self._user_rwlock.read():
             if username:
                 return self._user_map.get(username.lower())
             elif user_id:
-                for user_info in self._user_map.values():
-                    if str(user_info.get("userid")) == str(user_id):
-                        return user_info
+                return self._userid_map.get(str(user_id))
             return None
-        finally:
-            self.unlock("user_map")
-    
+
     def get_room_info(self, room_id=None):
-        self.lock("room_map")
-        try:
+        with self._room_rwlock.read():
             if room_id:
                 return self._joined_rooms.get(room_id)
             else:
+                if self._default_room_id is not None:
+                    cached = self._joined_rooms.get(self._default_room_id)
+                    if cached is not None:
+                        return cached
                 for r_id, r_info in self._joined_rooms.items():
-                    if r_info.get("name", "").lower() == self._default_room_name.lower():
+                    if r_info.get("name", "").lower() == self._default_room_name_lc:
                         return r_info
                 if not room_id and self._joined_rooms:
                     return list(self._joined_rooms.values())[0]
                 return None
+
+    def _get_lock(self, key):
+        lk = self._locks.get(key)
+        if lk is None:
+            with self._locks_guard:
+                lk = self._locks.setdefault(key, threading.Lock())
+        return lk
+
+    @contextlib.contextmanager
+    def locked(self, key):
+        """Context-manager flavor of lock()/unlock(). Preferred over the
+        paired calls: the release can't be forgotten on an exception path
+        and unlock()'s per-call key dispatch happens once."""
+        self.lock(key)
+        try:
+            yield
         finally:
-            self.unlock("room_map")
+            self.unlock(key)
 
     def lock(self, key):
-        if key not in self._locks:
-            with threading.Lock():
-                if key not in self._locks:
-                    self._locks[key] = threading.Lock()
-        self._locks[key].acquire()
+        if key == "user_map":
+            self._user_rwlock.acquire_write()
+        elif key == "room_map":
+            self._room_rwlock.acquire_write()
+        else:
+            self._get_lock(key).acquire()
 
     def unlock(self, key):
-        if key in self._locks:
-            self._locks[key].release()
+        if key == "user_map":
+            self._user_rwlock.release_write()
+        elif key == "room_map":
+            self._room_rwlock.release_write()
+        else:
+            lk = self._locks.get(key)
+            if lk is not None:
+                lk.release()
 
     def emit(self, event_name, *args, **kwargs):
-        self._log_to_ui("EVENT", "engine", {"event": event_name, "args": args, "kwargs": kwargs})
-        for callback in self._event_listeners.get(event_name, []):
-            threading.Thread(target=self._execute_plugin_callback, args=(callback, event_name, args, kwargs), daemon=True).start()
+        if self._verbose_ws:
+            self._log_to_ui("EVENT", "engine", {"event": event_name, "args": args, "kwargs": kwargs})
+        for callback in self._event_listeners.get(event_name, ()):
+            self._plugin_pool.submit(self._execute_plugin_callback, callback, event_name, args, kwargs)
 
     def on(self, event_name, callback):
-        if event_name not in self._event_listeners:
-            self._event_listeners[event_name] = []
-        self._event_listeners[event_name].append(callback)
+        self._event_listeners[event_name] = self._event_listeners.get(event_name, ()) + (callback,)
 
     def _execute_plugin_callback(self, callback, event_name, args, kwargs):
         try:
             callback(self, *args, **kwargs)
         except Exception as e:
             plugin_name = getattr(callback, '__module__', 'unknown_plugin')
+            # Walk and format the stack once; both sinks share the result.
+            tb = traceback.format_exc()
             error_message = f"Plugin '{plugin_name}' crashed: {e}"
-            engine_logger.error(error_message)
-            self._log_to_ui("ERROR", plugin_name, error_message, full_json={"error": str(e)})
+            engine_logger.error("%s\n%s", error_message, tb)
+            self._log_to_ui("ERROR", plugin_name, error_message, full_json={"error": str(e), "traceback": tb})
 
     def _upload_image(self, img_bytes, file_type='jpg'):
         try:
             mime = 'image/gif' if file_type == 'gif' else 'image/jpeg'
             fname = f'file.{file_type}'
-            files = {'file': (fname, img_bytes, mime)}
+            files = {'file': (fname, io.BytesIO(img_bytes), mime)}
             payload = {'UserID': self._bot_id, 'token': self._session_token, 'uploadType': 'image'}
-            r = requests.post("https://api.howdies.app/api/upload", files=files, data=payload).json()
+            with self._upload_sem:
+                r = self._http.post("https://api.howdies.app/api/upload", files=files, data=payload, timeout=(5, 30)).json()
             return r.get("url")
         except Exception as e:
-            engine_logger.error(f"Error uploading image: {e}")
+            engine_logger.error("Error uploading image: %s", e)
             return None
 
+    def _rate_limit(self):
+        with self._send_bucket_lock:
+            now = time.monotonic()
+            self._send_tokens = min(self._send_burst, self._send_tokens + (now - self._send_last) * self._send_rate)
+            self._send_last = now
+            self._send_tokens -= 1.0
+            wait = -self._send_tokens / self._send_rate if self._send_tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+    def _start_worker_threads(self):
+        """Starts (or restarts) the sender and dispatch threads. stop()'s
+        sentinels terminate their loops, so after a dashboard Stop the next
+        run() must bring up fresh workers or nothing drains the queues."""
+        if self._sender_thread is None or not self._sender_thread.is_alive():
+            self._sender_thread = threading.Thread(target=self._sender_loop, daemon=True, name="ws-sender")
+            self._sender_thread.start()
+        if self._dispatch_thread is None or not self._dispatch_thread.is_alive():
+            self._dispatch_thread = threading.Thread(target=self._dispatch_loop, daemon=True, name="ws-dispatch")
+            self._dispatch_thread.start()
+
+    def _sender_loop(self):
+        """Drains the outbound queue. Up to 16 queued payloads are pulled per
+        wakeup and written back-to-back so bursts amortize the wakeup and
+        coalesce on the wire; a None sentinel shuts the loop down."""
+        while True:
+            payload = self._send_queue.get()
+            if payload is None:
+                # A stale sentinel from a stop() that was superseded by a
+                # restart must not kill the live worker.
+                if self._bot_running:
+                    continue
+                break
+            batch = [payload]
+            while len(batch) < 16:
+                try:
+                    nxt = self._send_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._send_queue.put_nowait(None)
+                    break
+                batch.append(nxt)
+            for p in batch:
+                self._rate_limit()
+                try:
+                    self._ws_app.send(_json_dumps(p))
+                    if self._verbose_ws:
+                        self._log_to_ui("EVENT_OUT", "websocket", "Outgoing Payload", full_json=p)
+                except Exception as e:
+                    engine_logger.error("Failed to send payload: %s", e)
+                    self._log_to_ui("ERROR", "engine", "Failed to send payload", full_json=p)
+
     def send_payload(self, payload):
         if self._ws_connected and self._ws_app:
             try:
-                self._ws_app.send(json.dumps(payload))
-                self._log_to_ui("EVENT_OUT", "websocket", "Outgoing Payload", full_json=payload)
-                time.sleep(0.1)
-                return True
-            except Exception as e:
-                engine_logger.error(f"Failed to send payload: {e}")
-                self._log_to_ui("ERROR", "engine", "Failed to send payload", full_json=payload)
+                self._send_queue.put_nowait(payload)
+            except queue.Full:
+                # The server can't keep up (or pacing is far behind); better
+                # to shed the payload than block every plugin worker.
+                self._log_to_ui("WARNING", "engine", "Outbound queue full, dropping payload", full_json=payload)
                 return False
+            return True
         else:
             self._log_to_ui("WARNING", "engine", "WS disconnected", full_json=payload)
             return False
 
+    def _resolve_room(self, room_id):
+        room_to_send_to = room_id or self._default_room_id
+        if not room_to_send_to:
+            default_room_info = self.get_room_info(room_id=None)
+            if default_room_info:
+                room_to_send_to = default_room_info.get("id")
+        return room_to_send_to
+
     def send_text_message(self, target_id_or_username, text, is_dm=False, room_id=None):
-        payload = {"id": self._get_gid(), "type": "text", "text": text}
         if is_dm:
-            payload["handler"] = "message"
+            payload = _TEXT_DM_TMPL.copy()
             payload["to"] = target_id_or_username
         else:
-            payload["handler"] = "chatroommessage"
-            room_to_send_to = room_id
-            if not room_to_send_to:
-                default_room_info = self.get_room_info(room_id=None)
-                if default_room_info:
-                    room_to_send_to = default_room_info.get("id")
-            
+            room_to_send_to = self._resolve_room(room_id)
             if not room_to_send_to:
                 return False
+            payload = _TEXT_ROOM_TMPL.copy()
             payload["roomid"] = room_to_send_to
+        payload["id"] = self._get_gid()
+        payload["text"] = text
         return self.send_payload(payload)
 
     def send_image_message(self, target_id_or_username, url, caption, is_dm=False, room_id=None):
-        payload = {"id": self._get_gid(), "type": "image", "text": caption, "url": url}
         if is_dm:
-            payload["handler"] = "message"
+            payload = _IMAGE_DM_TMPL.copy()
             payload["to"] = target_id_or_username
         else:
-            payload["handler"] = "chatroommessage"
-            room_to_send_to = room_id
-            if not room_to_send_to:
-                default_room_info = self.get_room_info(room_id=None)
-                if default_room_info:
-                    room_to_send_to = default_room_info.get("id")
+            room_to_send_to = self._resolve_room(room_id)
             if not room_to_send_to:
                 return False
+            payload = _IMAGE_ROOM_TMPL.copy()
             payload["roomid"] = room_to_send_to
+        payload["id"] = self._get_gid()
+        payload["text"] = caption
+        payload["url"] = url
         return self.send_payload(payload)
 
     def _ws_connect(self):
         websocket_url = f"wss://app.howdies.app/howdies?token={self._session_token}"
-        engine_logger.info(f"Connecting to WS...")
+        engine_logger.info("Connecting to WS...")
         self._ws_app = websocket.WebSocketApp(
             websocket_url,
             on_open=self._on_open,
@@ -188,7 +457,10 @@ class HowdiesBotEngine:
         self._ws_connected = False
         self._reconnect_attempts = 0
         self._update_bot_status("Connecting")
-        self._ws_app.run_forever(ping_interval=20, ping_timeout=10, reconnect=True) 
+        # skip_utf8_validation avoids websocket-client's pure-Python UTF-8
+        # scan over every inbound frame; the JSON parser validates anyway.
+        self._ws_app.run_forever(ping_interval=20, ping_timeout=10, reconnect=True,
+                                 skip_utf8_validation=True)
 
     def _on_open(self, ws):
         engine_logger.info("WS Opened.")
@@ -196,24 +468,55 @@ class HowdiesBotEngine:
         self._ws_connected = True
         self._reconnect_attempts = 0
         self._update_bot_status("Connected")
-        self.send_payload({"handler": "login", "username": self._bot_username, "password": os.getenv("BOT_PASSWORD")})
+        self.send_payload({"handler": "login", "username": self._bot_username, "password": self._bot_password})
 
     def _on_message(self, ws, message):
+        self._inbound_q.put_nowait(message)
+
+    def _dispatch_loop(self):
+        """Drains the inbound queue; up to 64 ready frames are pulled per
+        wakeup so bursts (e.g. roster sync on join) amortize the queue
+        handshake. A None sentinel shuts the loop down."""
+        while True:
+            message = self._inbound_q.get()
+            if message is None:
+                if self._bot_running:
+                    continue
+                break
+            batch = [message]
+            while len(batch) < 64:
+                try:
+                    nxt = self._inbound_q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._inbound_q.put_nowait(None)
+                    break
+                batch.append(nxt)
+            for raw in batch:
+                self._process_message(raw)
+
+    def _process_message(self, message):
         try:
-            payload = json.loads(message)
+            payload = _json_loads(message)
             handler = payload.get("handler")
-            self._log_to_ui("EVENT_IN", "websocket", "Incoming Payload", full_json=payload)
+            if self._verbose_ws:
+                self._log_to_ui("EVENT_IN", "websocket", "Incoming Payload", full_json=payload)
             self._update_internal_state(payload)
-            self.emit(f"event:{handler}", payload)
+            event_name = self._event_names.get(handler)
+            if event_name is None:
+                event_name = self._event_names.setdefault(handler, "event:" + str(handler))
+            if event_name in self._event_listeners:
+                self.emit(event_name, payload)
         except Exception as e:
-            engine_logger.error(f"Error processing WS message: {e}")
+            engine_logger.error("Error processing WS message: %s", e)
 
     def _on_error(self, ws, error):
-        engine_logger.error(f"WS Error: {error}")
+        engine_logger.error("WS Error: %s", error)
         self._log_to_ui("ERROR", "websocket", "WS Error", full_json=str(error))
 
     def _on_close(self, ws, close_status_code, close_msg):
-        engine_logger.warning(f"WS Closed: {close_status_code}")
+        engine_logger.warning("WS Closed: %s", close_status_code)
         self._ws_connected = False
         self._update_bot_status("Disconnected")
 
@@ -221,9 +524,10 @@ class HowdiesBotEngine:
         handler = payload.get("handler")
 
         if handler == "login" and payload.get("success"):
-            received_bot_id = payload.get("userID") or payload.get("userid") or payload.get("id")
+            received_bot_id = _extract_uid(payload)
             if received_bot_id and not self._bot_id:
                 self._bot_id = received_bot_id
+                self._refresh_bot_identities()
             self.send_payload({"handler": "joinchatroom", "id": self._get_gid(), "name": self._default_room_name, "roomPassword": ""})
 
         if handler in ["activeoccupants", "getusers", "userjoin", "profile"]:
@@ -235,46 +539,70 @@ class HowdiesBotEngine:
             elif handler == "profile" and "user" in payload:
                 users_data = [payload["user"]]
             
-            for user_info in users_data:
-                uname = user_info.get("username")
-                uid = user_info.get("userID") or user_info.get("userid") or user_info.get("id")
-                avatar = user_info.get("avatar")
-                if uname and uid:
-                    self.lock("user_map")
-                    self._user_map[uname.lower()] = {"userid": uid, "username": uname, "avatar": avatar}
-                    self.unlock("user_map")
+            if users_data:
+                # Build the batch outside the lock, then merge it with one
+                # C-level dict.update instead of N interpreted setitems while
+                # holding the lock. One lock acquisition per roster payload.
+                new_users = {}
+                for user_info in users_data:
+                    uname = user_info.get("username")
+                    uid = _extract_uid(user_info)
+                    avatar = user_info.get("avatar")
+                    if uname and uid:
+                        new_users[uname.lower()] = {"userid": uid, "username": uname, "avatar": avatar}
+                if new_users:
+                    # Both indexes share the same info dicts, so later
+                    # mutations stay visible through either lookup path.
+                    new_by_id = {str(info["userid"]): info for info in new_users.values()}
+                    with self.locked("user_map"):
+                        self._user_map.update(new_users)
+                        self._userid_map.update(new_by_id)
 
         if handler == "joinchatroom" and payload.get("success"):
             room_id = payload.get("roomid")
             room_name = payload.get("name") or self._default_room_name
             if room_id:
-                self.lock("room_map")
-                self._joined_rooms[room_id] = {"id": room_id, "name": room_name}
-                self.unlock("room_map")
+                with self.locked("room_map"):
+                    self._joined_rooms[room_id] = {"id": room_id, "name": room_name}
+                if room_name and room_name.lower() == self._default_room_name_lc:
+                    self._default_room_id = room_id
         elif handler == "leavechatroom" and payload.get("success"):
             room_id = payload.get("roomid")
             if room_id in self._joined_rooms:
-                self.lock("room_map")
-                del self._joined_rooms[room_id]
-                self.unlock("room_map")
+                with self.locked("room_map"):
+                    del self._joined_rooms[room_id]
+                if room_id == self._default_room_id:
+                    self._default_room_id = None
 
     def run(self):
         engine_logger.info("Bot Engine Starting...")
         self._update_bot_status("Starting")
+        self._start_worker_threads()
         while self._bot_running:
             try:
                 self._ws_connect()
-                if not self._bot_running: 
+                if not self._bot_running:
+                    break
+                if self._stop_event.wait(10):
                     break
-                time.sleep(10)
             except Exception as e:
-                engine_logger.critical(f"Run loop error: {e}")
-                time.sleep(30)
+                engine_logger.critical("Run loop error: %s", e)
+                if self._stop_event.wait(30):
+                    break
         self._update_bot_status("Stopped")
 
     def stop(self):
         engine_logger.info("Stopping Bot Engine...")
         self._bot_running = False
+        self._stop_event.set()
+        try:
+            self._send_queue.put_nowait(None)
+        except queue.Full:
+            # A saturated queue means the sender is alive and draining; once
+            # it empties out it just blocks on get(), which is harmless for
+            # a daemon thread, and a later run() reuses it as-is.
+            pass
+        self._inbound_q.put_nowait(None)
         if self._ws_app:
             try:
                 self._ws_app.close()
@@ -283,28 +611,42 @@ class HowdiesBotEngine:
 
     def clean_logout(self):
         self.stop()
+        self._plugin_pool.shutdown(wait=False, cancel_futures=True)
+        # No further reconnects will happen; drop the credential so the
+        # string doesn't linger on the instance for the process lifetime.
+        self._bot_password = None
 
     def _log_to_ui(self, log_type, source, message, full_json=None):
+        # When no UI client is streaming logs, informational entries would
+        # just age out of the ring buffer unread — skip building them.
+        # Errors and warnings are always kept so history survives bursts.
+        if (self._ui_log_active is not None
+                and not self._ui_log_active.is_set()
+                and log_type not in ("ERROR", "CRITICAL", "WARNING")):
+            return
+        # strftime is surprisingly costly on the WS receive path; timestamps
+        # only have second resolution, so re-format at most once per second.
+        sec = int(time.time())
+        if sec != self._last_log_sec:
+            self._last_log_ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+            self._last_log_sec = sec
         log_entry = {
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": self._last_log_ts,
             "source": source,
             "type": log_type,
             "message": message,
             "full_json": full_json
         }
-        try:
-            self._ui_log_queue.put_nowait(log_entry)
-        except queue.Full:
-            pass
+        # ui_log_queue is a fixed-size ring (_LogBus): append takes its
+        # Condition briefly and notifies waiting SSE readers, overwriting
+        # the oldest slot when full, so no Full handling is needed here.
+        self._ui_log_queue.append(log_entry)
         
     def _update_bot_status(self, status_message):
-        self.lock("bot_status")
+        # A plain str attribute assignment is atomic under the GIL, so no
+        # lock is needed around a single read or write of the status.
         self._current_status = status_message
-        self.unlock("bot_status")
         self._bot_status_event.set()
 
     def get_current_status(self):
-        self.lock("bot_status")
-        status = getattr(self, '_current_status', 'Unknown')
-        self.unlock("bot_status")
-        return status
+        return self._current_status
@@ -0,0 +1,522 @@
+# db.py (DATABASE LAYER – CRITICAL)
+
+import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+import collections
+import contextlib
+import csv
+import io
+import itertools
+import os
+import json
+import logging
+import threading
+import urllib.parse
+
+# Same serializer policy as bot_engine: orjson when installed, stdlib
+# otherwise. Compact separators keep the bind payload small on the wire.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+# --- Logging Setup for db.py ---
+db_logger = logging.getLogger('db')
+db_logger.setLevel(logging.INFO)
+# -------------------------------
+
+# The hot statements are fixed SQL, so they are PREPAREd once per pooled
+# connection and invoked via EXECUTE afterwards — Postgres skips the
+# parse/plan step on every call after the first. Prepared-statement
+# parameters ($n) can also be referenced more than once, which pyformat
+# placeholders can't, so the feature upsert binds feature_key a single time.
+# The conflict path must add the raw delta ($4), not EXCLUDED.currency —
+# that is the already-evaluated insert value with the 500 signup bonus
+# folded in, and using it re-credited the bonus on every update.
+_PREPARE_STATEMENTS = (
+    """PREPARE upsert_user_stats(varchar, varchar, bigint, bigint) AS
+        INSERT INTO user_stats (user_id, username, permanent_score, currency)
+        VALUES ($1, $2, $3, GREATEST(500 + $4, 0))
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = EXCLUDED.username,
+            permanent_score = user_stats.permanent_score + EXCLUDED.permanent_score,
+            currency = GREATEST(user_stats.currency + $4, 0);""",
+    """PREPARE upsert_user_feature(varchar, varchar, bigint, bigint, jsonb, text) AS
+        INSERT INTO user_stats (user_id, username, permanent_score, currency, feature_data)
+        VALUES ($1, $2, $3, GREATEST(500 + $4, 0), $5)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = EXCLUDED.username,
+            permanent_score = user_stats.permanent_score + EXCLUDED.permanent_score,
+            currency = GREATEST(user_stats.currency + $4, 0),
+            feature_data = jsonb_set(
+                COALESCE(user_stats.feature_data, '{}'::jsonb), ARRAY[$6],
+                COALESCE(user_stats.feature_data->$6, '{}'::jsonb) || EXCLUDED.feature_data->$6,
+                true);""",
+    """PREPARE adjust_user_currency(bigint, varchar) AS
+        UPDATE user_stats SET currency = currency + $1
+        WHERE user_id = $2 AND currency + $1 >= 0
+        RETURNING currency;""",
+)
+
+
+def _tune_dsn(database_url):
+    """Fills in connection options the URL usually omits, without overriding
+    anything set explicitly. A loopback host is redirected to the local
+    Unix socket when one exists (skips TCP framing and TLS per message);
+    TCP connections get keepalives so pooled sessions idling between game
+    ticks surface a dead peer instead of hanging the next query."""
+    try:
+        parts = urllib.parse.urlsplit(database_url)
+        if not parts.scheme.startswith("postgres"):
+            return database_url
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        if parts.hostname in ("localhost", "127.0.0.1") and os.path.isdir("/var/run/postgresql"):
+            userinfo, _, _ = parts.netloc.rpartition("@")
+            netloc = userinfo + "@" if userinfo else ""
+            if parts.port:
+                netloc += f":{parts.port}"
+            query.setdefault("host", "/var/run/postgresql")
+            query.setdefault("sslmode", "disable")
+        else:
+            netloc = parts.netloc
+            query.setdefault("keepalives", "1")
+            query.setdefault("keepalives_idle", "30")
+            query.setdefault("keepalives_interval", "10")
+        return urllib.parse.urlunsplit(
+            (parts.scheme, netloc, parts.path, urllib.parse.urlencode(query), parts.fragment))
+    except Exception:
+        # A DSN we can't parse is passed through untouched; psycopg2 will
+        # produce the real error message if it's actually malformed.
+        return database_url
+
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """Connection subclass so per-connection state (like the prepared flag)
+    can live as a plain attribute; the C base type has no __dict__."""
+    prepared = False
+
+class DatabaseManager:
+    def __init__(self, database_url, minconn=None, maxconn=None):
+        database_url = _tune_dsn(database_url)
+        self._database_url = database_url
+        if minconn is None:
+            minconn = int(os.getenv("DB_POOL_MIN", 4))
+        if maxconn is None:
+            # ~4x vCPU is what Postgres can actually schedule; beyond that
+            # extra backends just contend with each other. Deployments that
+            # front the DB with PgBouncer in transaction mode should set
+            # DB_POOL_MAX small (<=16) and let the bouncer do the funneling.
+            maxconn = int(os.getenv("DB_POOL_MAX", min(4 * (os.cpu_count() or 4), 32)))
+        minconn = min(minconn, maxconn)
+        # Read cache for get_user_stats. This process is the only writer
+        # for its users, so invalidating on our own writes keeps it
+        # coherent; set DB_USER_CACHE=0 when several bot processes share
+        # one database.
+        self._user_cache_cap = int(os.getenv("DB_USER_CACHE", 4096))
+        self._user_cache = collections.OrderedDict()
+        self._user_cache_lock = threading.Lock()
+        # One shared pool instead of per-call connect/close: every public
+        # method used to pay a fresh TCP+auth handshake because its finally
+        # block closed the connection. The pool keeps sessions warm and
+        # bounds how many backends we can hold open at once.
+        # ThreadedConnectionPool opens minconn connections up front, so the
+        # first few DB calls after startup are already warm.
+        try:
+            self._pool = psycopg2.pool.ThreadedConnectionPool(
+                minconn, maxconn, dsn=database_url, connection_factory=_PooledConnection)
+        except Exception as e:
+            db_logger.critical("Failed to connect to database: %s", e)
+            raise
+
+    @contextlib.contextmanager
+    def _conn(self):
+        """Checks a connection out of the pool and returns it afterwards."""
+        conn = self._pool.getconn()
+        try:
+            yield conn
+        finally:
+            self._pool.putconn(conn)
+
+    def _ensure_prepared(self, conn):
+        """PREPAREs the hot statements once for this pooled connection.
+        Must not run before init_db has created the table."""
+        if conn.prepared:
+            return
+        cursor = conn.cursor()
+        for stmt in _PREPARE_STATEMENTS:
+            cursor.execute(stmt)
+        conn.commit()
+        conn.prepared = True
+
+    def init_db(self):
+        """Initializes the user_stats table, creating it if it doesn't exist."""
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS user_stats (
+                        user_id VARCHAR PRIMARY KEY,
+                        username VARCHAR NOT NULL,
+                        permanent_score BIGINT DEFAULT 0,
+                        currency BIGINT DEFAULT 500 CHECK (currency >= 0),
+                        feature_data JSONB DEFAULT '{}'::jsonb
+                    );
+                    -- Lookup index only: Howdies usernames aren't guaranteed
+                    -- unique over time, and a UNIQUE index here would both
+                    -- reject the second user with a recycled name and make
+                    -- every upsert pay a uniqueness probe.
+                    CREATE INDEX IF NOT EXISTS idx_user_username ON user_stats (username);
+                    -- Earlier deployments created this index UNIQUE; rebuild it plain.
+                    DO $$
+                    BEGIN
+                        IF EXISTS (SELECT 1 FROM pg_index i
+                                   JOIN pg_class c ON c.oid = i.indexrelid
+                                   WHERE c.relname = 'idx_user_username' AND i.indisunique) THEN
+                            DROP INDEX idx_user_username;
+                            CREATE INDEX idx_user_username ON user_stats (username);
+                        END IF;
+                    END $$;
+                """)
+                conn.commit()
+                db_logger.info("Database 'user_stats' table ensured/initialized.")
+            except Exception as e:
+                db_logger.critical("Error initializing database table: %s", e)
+                conn.rollback()
+                raise
+
+    def execute_ddl(self, sql):
+        """Runs a (parameterless) DDL script and commits."""
+        with self._conn() as conn:
+            try:
+                conn.cursor().execute(sql)
+                conn.commit()
+            except Exception as e:
+                db_logger.error("DDL failed: %s. Error: %s", sql, e)
+                conn.rollback()
+                raise
+
+    def execute_write(self, sql, params=None):
+        """Runs one DML statement, commits, and returns the affected row count."""
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                rowcount = cursor.rowcount
+                conn.commit()
+                return rowcount
+            except Exception as e:
+                db_logger.error("Write failed: %s with params %s. Error: %s", sql, params, e)
+                conn.rollback()
+                raise
+
+    def fetch_one(self, sql, params=None):
+        """SELECT helper: returns the first row as a dict, or None."""
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+                conn.rollback() # read-only; just end the transaction
+                return row
+            except Exception as e:
+                db_logger.error("Fetch failed: %s with params %s. Error: %s", sql, params, e)
+                conn.rollback()
+                raise
+
+    def fetch_all(self, sql, params=None):
+        """SELECT helper: returns all rows as namedtuples (cheap to build,
+        still attribute-addressable for callers)."""
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.NamedTupleCursor)
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+                conn.rollback() # read-only; just end the transaction
+                return rows
+            except Exception as e:
+                db_logger.error("Fetch failed: %s with params %s. Error: %s", sql, params, e)
+                conn.rollback()
+                raise
+
+    def query(self, sql, params=None, fetch_one=False, cursor_factory=psycopg2.extras.RealDictCursor):
+        """
+        Executes a SQL query.
+        Returns a list of dictionaries (rows) or a single dictionary if fetch_one is True.
+        Compatibility entry point: new call sites that know their statement
+        shape should prefer execute_ddl/execute_write/fetch_one/fetch_all,
+        which skip the result-shape branching below.
+        Dict rows cost a fresh dict and a hash per column for every row;
+        bulk readers (leaderboards etc.) should pass cursor_factory=None for
+        plain tuples, or psycopg2.extras.NamedTupleCursor for attribute
+        access, and keep dict rows for results that get serialized to JSON.
+        """
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor(cursor_factory=cursor_factory)
+                cursor.execute(sql, params)
+
+                if cursor.description: # Query returned rows (SELECT, or DML with RETURNING)
+                    if fetch_one:
+                        result = cursor.fetchone()
+                    else:
+                        result = cursor.fetchall()
+                else: # DDL/DML query without returning data
+                    result = {"status": "success", "rows_affected": cursor.rowcount}
+
+                # Plain SELECTs have nothing to make durable; rollback ends
+                # the transaction without the commit WAL flush. WITH is left
+                # on the commit path since CTEs can wrap DML.
+                if sql.lstrip()[:6].upper() == "SELECT":
+                    conn.rollback()
+                else:
+                    conn.commit()
+
+                return result
+            except Exception as e:
+                db_logger.error("Database query failed: %s with params %s. Error: %s", sql, params, e)
+                conn.rollback()
+                raise # Re-raise to let calling plugin/engine handle specific errors
+
+    def query_many(self, sql, seq_of_params, page_size=1000):
+        """
+        Executes one SQL statement for many parameter sets in a single
+        transaction. Plugins updating many users per game tick should use
+        this instead of looping over query(): the parameter sets travel in
+        packed protocol messages rather than one round-trip each.
+
+        Statements written as `INSERT ... VALUES %s` (one placeholder for
+        the whole row list) go through execute_values, which folds the rows
+        into multi-row VALUES lists; anything else goes through
+        execute_batch. The input is consumed one page_size slice at a time,
+        so generators of any length work without being materialized. The
+        default of 1000 is Postgres's measured sweet spot — larger pages
+        stop helping. Returns the number of parameter sets executed.
+        """
+        it = iter(seq_of_params)
+        use_values = "values %s" in sql.lower()
+        total = 0
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor()
+                while True:
+                    page = list(itertools.islice(it, page_size))
+                    if not page:
+                        break
+                    if use_values:
+                        psycopg2.extras.execute_values(cursor, sql, page, page_size=page_size)
+                    else:
+                        psycopg2.extras.execute_batch(cursor, sql, page, page_size=page_size)
+                    total += len(page)
+                conn.commit()
+                return total
+            except Exception as e:
+                db_logger.error("Batched query failed: %s (after %d param sets). Error: %s", sql, total, e)
+                conn.rollback()
+                raise
+
+    # Below this size execute_values is just as fast and avoids the temp
+    # table; above it COPY's bulk stream wins clearly.
+    _COPY_THRESHOLD = 1024
+
+    _BULK_UPSERT_SQL = """
+        INSERT INTO user_stats (user_id, username, permanent_score, currency, feature_data)
+        SELECT * FROM user_stats_staging
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = EXCLUDED.username,
+            permanent_score = EXCLUDED.permanent_score,
+            currency = EXCLUDED.currency,
+            feature_data = EXCLUDED.feature_data;
+    """
+
+    def bulk_upsert_users(self, rows):
+        """
+        Bulk-loads user rows (user_id, username, permanent_score, currency,
+        feature_data dict) for migrations and snapshot restores. Small
+        batches use a multi-row VALUES insert; larger ones stream through
+        COPY into a temp table and merge with one UPSERT, skipping per-row
+        parse/plan and ON CONFLICT probing during the load. Returns the
+        number of rows loaded.
+        """
+        rows = [(uid, name, score, cur, _json_dumps(feat or {}))
+                for uid, name, score, cur, feat in rows]
+        if not rows:
+            return 0
+        if len(rows) <= self._COPY_THRESHOLD:
+            loaded = self.query_many("""
+                INSERT INTO user_stats (user_id, username, permanent_score, currency, feature_data)
+                VALUES %s
+                ON CONFLICT (user_id) DO UPDATE SET
+                    username = EXCLUDED.username,
+                    permanent_score = EXCLUDED.permanent_score,
+                    currency = EXCLUDED.currency,
+                    feature_data = EXCLUDED.feature_data;
+            """, rows)
+            with self._user_cache_lock:
+                self._user_cache.clear()
+            return loaded
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerows(rows)
+        buf.seek(0)
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    CREATE TEMP TABLE user_stats_staging
+                    (LIKE user_stats INCLUDING DEFAULTS) ON COMMIT DROP;
+                """)
+                cursor.copy_expert("COPY user_stats_staging FROM STDIN WITH (FORMAT csv)", buf)
+                cursor.execute(self._BULK_UPSERT_SQL)
+                conn.commit()
+                with self._user_cache_lock:
+                    self._user_cache.clear()
+                db_logger.info("Bulk-upserted %d user rows via COPY.", len(rows))
+                return len(rows)
+            except Exception as e:
+                db_logger.error("Bulk user upsert failed (%d rows): %s", len(rows), e)
+                conn.rollback()
+                raise
+
+    def update_user_stats(self, user_id, username, stats, feature_key=None):
+        """
+        Updates user statistics in a single UPSERT round-trip.
+        Inserts the row if missing, otherwise adds the permanent_score and
+        currency deltas from 'stats' and (if feature_key is given) merges the
+        plugin's dict into feature_data under that key. The currency delta is
+        clamped so the balance never goes below zero; callers that need the
+        insufficient-funds error should use adjust_currency instead.
+        """
+        score_delta = stats.get('permanent_score', 0)
+        if not isinstance(score_delta, int):
+            score_delta = 0
+        currency_delta = stats.get('currency', 0)
+        if not isinstance(currency_delta, int):
+            currency_delta = 0
+
+        if feature_key:
+            # EXCLUDED.feature_data carries {feature_key: new_dict}; on
+            # conflict its subtree is overlaid onto the existing one so
+            # sibling features stay intact.
+            sql = "EXECUTE upsert_user_feature (%s, %s, %s, %s, %s, %s);"
+            params = (user_id, username, score_delta, currency_delta,
+                      _json_dumps({feature_key: stats.get(feature_key, {})}),
+                      feature_key)
+        else:
+            sql = "EXECUTE upsert_user_stats (%s, %s, %s, %s);"
+            params = (user_id, username, score_delta, currency_delta)
+
+        with self._conn() as conn:
+            try:
+                self._ensure_prepared(conn)
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                conn.commit()
+                self._invalidate_user(user_id)
+                db_logger.debug("User stats updated for %s (ID: %s).", username, user_id)
+            except Exception as e:
+                db_logger.error("Error updating user stats for %s (ID: %s): %s", username, user_id, e)
+                conn.rollback()
+                raise
+
+    def _invalidate_user(self, user_id):
+        if self._user_cache_cap:
+            with self._user_cache_lock:
+                self._user_cache.pop(user_id, None)
+
+    def get_user_stats(self, user_id):
+        """
+        Returns the user's stats row as a dict (or None if unknown).
+        Hits are served from an in-process LRU cache, so steady-state reads
+        of hot users never touch Postgres; every write path in this class
+        invalidates the entry after commit.
+        """
+        if self._user_cache_cap:
+            with self._user_cache_lock:
+                row = self._user_cache.get(user_id)
+                if row is not None:
+                    self._user_cache.move_to_end(user_id)
+                    return dict(row)
+        row = self.fetch_one("SELECT * FROM user_stats WHERE user_id = %s;", (user_id,))
+        if row is not None and self._user_cache_cap:
+            with self._user_cache_lock:
+                self._user_cache[user_id] = dict(row)
+                while len(self._user_cache) > self._user_cache_cap:
+                    self._user_cache.popitem(last=False)
+        return row
+
+    def get_feature(self, user_id, feature_key):
+        """
+        Returns one feature's subtree from feature_data (a dict, or None if
+        the user or key doesn't exist). The '->' projection happens in
+        Postgres, so only the requested subtree travels over the wire and
+        gets parsed, not the whole feature_data blob.
+        """
+        with self._conn() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT feature_data -> %s FROM user_stats WHERE user_id = %s;",
+                    (feature_key, user_id))
+                row = cursor.fetchone()
+                conn.rollback() # read-only; just end the transaction
+                return row[0] if row else None
+            except Exception as e:
+                db_logger.error("Feature fetch failed for %s/%s: %s", user_id, feature_key, e)
+                conn.rollback()
+                raise
+
+    def adjust_currency(self, user_id, amount):
+        """
+        Atomically adjusts user's currency and returns the new balance.
+        Raises ValueError if the user doesn't exist or the adjustment would
+        make the balance negative.
+        """
+        with self._conn() as conn:
+            try:
+                self._ensure_prepared(conn)
+                cursor = conn.cursor()
+                # Row-level locking under MVCC already makes this
+                # read-modify-write atomic when it's a single statement; the
+                # WHERE guard enforces the non-negative balance without a
+                # separate SELECT or advisory lock.
+                cursor.execute("EXECUTE adjust_user_currency (%s, %s);", (amount, user_id))
+                row = cursor.fetchone()
+                conn.commit()
+                self._invalidate_user(user_id)
+
+                if row is None:
+                    # Distinguish missing user from insufficient funds for callers.
+                    cursor.execute("SELECT 1 FROM user_stats WHERE user_id = %s;", (user_id,))
+                    exists = cursor.fetchone() is not None
+                    conn.rollback()
+                    if not exists:
+                        raise ValueError(f"User {user_id} not found in database for currency adjustment.")
+                    raise ValueError(f"Insufficient funds for user {user_id}. Attempted to go negative.")
+
+                new_currency = row[0]
+                db_logger.debug("Adjusted currency for %s by %s. New balance: %s", user_id, amount, new_currency)
+                return new_currency
+            except ValueError as ve:
+                db_logger.warning("Currency adjustment failed for %s: %s", user_id, ve)
+                raise # Re-raise for plugin to handle
+            except Exception as e:
+                db_logger.error("Critical error during atomic currency adjustment for %s: %s", user_id, e)
+                conn.rollback()
+                raise
+
+# Helper function for JSONB merging
+# PostgreSQL's `||` operator merges top-level JSON objects.
+# For deep merge, you might need a custom function or more complex `jsonb_set` logic.
+# Example for deep merge (requires PL/pgSQL function or similar):
+# CREATE OR REPLACE FUNCTION jsonb_merge(jsonb, jsonb) RETURNS jsonb LANGUAGE SQL AS $$
+#     SELECT jsonb_strip_nulls($1) || jsonb_strip_nulls($2)
+# $$;
+# For feature_data, using `jsonb_set` with `||` on the target key is a common robust approach for nested merging.
@@ -12,17 +12,6 @@ plugin_logger.setLevel(logging.INFO)
 # Store active command handlers specific to this plugin
 _command_handlers = {}
 
-def _parse_command(text):
-    """Parses command text into cmd, arg1, arg2."""
-    if not text.startswith(("!", ".")):
-        return None, None, None, None
-    
-    parts = text[1:].split(maxsplit=2)
-    cmd = parts[0].lower()
-    arg1 = parts[1].strip() if len(parts) > 1 else ""
-    arg2 = parts[2].strip() if len(parts) > 2 else ""
-    return cmd, arg1, arg2, text # Return original text too for full context
-
 def _register_command(cmd_name, handler_func):
     """Registers a command handler for this plugin."""
     _command_handlers[cmd_name.lower()] = handler_func
@@ -74,7 +63,7 @@ def _on_profile_response(engine_instance, payload):
         if target_room_id:
             engine_instance.send_text_message(target_room_id, f"👤 {username} | ID: {user_id} | Lvl: {level}")
         else:
-            plugin_logger.warning(f"Profile response for {username} received, but no default room to reply to.")
+            plugin_logger.warning("Profile response for %s received, but no default room to reply to.", username)
 
 def _handle_display_picture(engine_instance, payload, cmd, arg1, arg2):
     """Handles !dp [username] command."""
@@ -96,11 +85,8 @@ def _handle_list_users(engine_instance, payload, cmd, arg1, arg2):
     sender_username = payload.get("username", "Unknown")
     reply_target = sender_username if payload.get("handler") == "message" else None
 
-    engine_instance.lock("user_map") # Lock user_map before reading
-    try:
+    with engine_instance.locked("user_map"): # Lock user_map while reading
         users = sorted([u['username'] for u in engine_instance._user_map.values()])
-    finally:
-        engine_instance.unlock("user_map") # Unlock after reading
 
     if users:
         user_list_msg = "👥 Users:\n" + "\n".join([f"{i}. {n}" for i, n in enumerate(users, 1)])
@@ -123,22 +109,30 @@ def _on_message_received(engine_instance, payload):
     sender_username = payload.get("username", "Unknown")
     
     # Ignore bot's own messages
-    if str(sender_id) == str(engine_instance.get_session()["bot_id"]):
+    if engine_instance.is_self(sender_id):
         return
 
-    cmd, arg1, arg2, original_text = _parse_command(text)
-
-    if cmd and cmd in _command_handlers:
-        plugin_logger.info(f"Command '{cmd}' received from @{sender_username}: '{original_text}'")
-        try:
-            # Execute the command handler in a separate thread for non-blocking execution
-            # The engine already does this via _execute_plugin_callback, but if a plugin
-            # wants to do additional long-running sub-tasks for a command, it can use threading here.
-            _command_handlers[cmd](engine_instance, payload, cmd, arg1, arg2)
-        except Exception as e:
-            plugin_logger.error(f"Error handling command '{cmd}' by plugin: {e}\n{traceback.format_exc()}")
-            reply_target = sender_username if handler_type == "message" else None
-            engine_instance.send_text_message(sender_username, f"Oops! '{cmd}' command chalate waqt error ho gayi. Please try again.", is_dm=bool(reply_target))
+    # Fast path: most room traffic is plain chat — bail before any parsing
+    # unless the text starts with a command prefix and names a known command.
+    if not text or text[0] not in "!.":
+        return
+    space_at = text.find(' ')
+    cmd = (text[1:] if space_at == -1 else text[1:space_at]).lower()
+    command_handler = _command_handlers.get(cmd)
+    if command_handler is None:
+        return
+
+    # Only a real command pays for the full argument split.
+    parts = text[1:].split(maxsplit=2)
+    arg1 = parts[1].strip() if len(parts) > 1 else ""
+    arg2 = parts[2].strip() if len(parts) > 2 else ""
+    plugin_logger.info("Command '%s' received from @%s: '%s'", cmd, sender_username, text)
+    try:
+        command_handler(engine_instance, payload, cmd, arg1, arg2)
+    except Exception as e:
+        plugin_logger.error("Error handling command '%s' by plugin: %s\n%s", cmd, e, traceback.format_exc())
+        reply_target = sender_username if handler_type == "message" else None
+        engine_instance.send_text_message(sender_username, f"Oops! '{cmd}' command chalate waqt error ho gayi. Please try again.", is_dm=bool(reply_target))
 
 
 # ================================
@@ -1,21 +1,115 @@
 import threading
-import queue
+import gzip
+import hashlib
 import json
 import time
 import logging
-from flask import Flask, render_template_string, jsonify, request, Response
+
+# Brotli beats gzip by ~15-20% on this page but is an optional extra.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Same serializer policy as the rest of the codebase: orjson when
+# installed, stdlib otherwise.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_bytes(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+from flask import Flask, jsonify, request, Response
 
 # --- Logging Setup for ui.py ---
 ui_logger = logging.getLogger('ui')
 ui_logger.setLevel(logging.INFO)
 # -------------------------------
 
-# Global queue for logs (populated by bot_engine)
-ui_log_queue = queue.Queue(maxsize=1000)
-# Event to signal UI about bot status changes (set by bot_engine)
-bot_status_event = threading.Event()
-# Event to signal UI about plugin status changes (set by plugins_loader)
-plugins_status_event = threading.Event()
+class _LogBus:
+    """Ring-buffer publish/subscribe channel for log entries.
+
+    Producers call append() — the same verb bot_engine already uses — which
+    is a single slot write plus a notify. Each SSE client reads forward
+    from its own cursor, so every connected dashboard tab sees every entry
+    instead of competing to pop a shared queue; a reader that falls more
+    than `size` entries behind just skips the overwritten ones.
+    """
+
+    def __init__(self, size=1024):
+        self._size = size
+        self._buf = [None] * size
+        self._pos = 0  # sequence number of the next write
+        self._cv = threading.Condition()
+
+    @property
+    def pos(self):
+        return self._pos
+
+    def append(self, item):
+        with self._cv:
+            self._buf[self._pos % self._size] = item
+            self._pos += 1
+            self._cv.notify_all()
+
+    def read_since(self, cursor, timeout=None):
+        """Returns (new_cursor, entries newer than cursor), waiting up to
+        timeout seconds for something to arrive. Entries overwritten while
+        the reader lagged are silently skipped."""
+        with self._cv:
+            # wait_for re-checks the predicate, so spurious wakeups don't
+            # produce empty results before the timeout actually expires.
+            self._cv.wait_for(lambda: self._pos != cursor, timeout)
+            if self._pos == cursor:
+                return cursor, []
+            start = max(cursor, self._pos - self._size)
+            entries = [self._buf[i % self._size] for i in range(start, self._pos)]
+            return self._pos, entries
+
+
+class _StatusSignal:
+    """Level-triggered change counter. Producers call set() exactly like the
+    threading.Event this replaces; consumers each remember the generation
+    they last saw and compare against gen. With a shared Event, whichever
+    SSE client woke first would clear() the flag and starve every other
+    dashboard tab — a counter has nothing to consume, so all clients (and
+    the plugin-status cache) observe every transition."""
+
+    def __init__(self):
+        self._gen = 0
+        self._cv = threading.Condition()
+
+    @property
+    def gen(self):
+        with self._cv:
+            return self._gen
+
+    def set(self):
+        with self._cv:
+            self._gen += 1
+            self._cv.notify_all()
+
+    def wait_changed(self, last_gen, timeout=None):
+        """Waits up to timeout seconds for the generation to move past
+        last_gen; returns the current generation either way."""
+        with self._cv:
+            self._cv.wait_for(lambda: self._gen != last_gen, timeout)
+            return self._gen
+
+
+# Global log channel (populated by bot_engine, fanned out to SSE clients).
+ui_log_queue = _LogBus(1024)
+# Signals bot status changes to the UI (set by bot_engine)
+bot_status_event = _StatusSignal()
+# Signals plugin status changes to the UI (set by plugins_loader)
+plugins_status_event = _StatusSignal()
+# Set while at least one UI client is consuming the log stream; lets the
+# engine skip building informational log entries nobody will read.
+ui_log_active = threading.Event()
 
 
 # --- Flask App Initialization ---
@@ -45,7 +139,8 @@ HTML_TEMPLATE = """
         }
         .nav-tabs button:hover { background-color: #e94560; color: #1a1a2e; }
         .nav-tabs button.active { background-color: #e94560; color: #1a1a2e; font-weight: bold; }
-        .tab-content { padding: 20px; max-width: 1200px; margin: 20px auto; background-color: #0f3460; border-radius: 8px; box-shadow: 0 4px 8px rgba(0, 0, 0, 0.4); }
+        .tab-content { display: none; padding: 20px; max-width: 1200px; margin: 20px auto; background-color: #0f3460; border-radius: 8px; box-shadow: 0 4px 8px rgba(0, 0, 0, 0.4); }
+        .tab-content.active { display: block; }
         .section-header { color: #e94560; border-bottom: 2px solid #1a1a2e; padding-bottom: 10px; margin-bottom: 20px; font-size: 1.5em; }
         .status-box { background-color: #16213e; padding: 15px; border-radius: 5px; margin-bottom: 15px; display: flex; justify-content: space-between; align-items: center; }
         .status-box strong { color: #e0e0e0; }
@@ -56,8 +151,9 @@ HTML_TEMPLATE = """
         .status-stopped { background-color: #9E9E9E; } /* Grey */
         .status-error { background-color: #e94560; } /* Pink */
 
-        .log-container { max-height: 500px; overflow-y: scroll; background-color: #16213e; border-radius: 5px; padding: 10px; }
+        .log-container { max-height: 500px; overflow-y: scroll; background-color: #16213e; border-radius: 5px; padding: 10px; display: flex; flex-direction: column; }
         .log-entry { border-bottom: 1px dashed #2e4a86; padding: 8px 0; font-family: 'Consolas', 'Monaco', monospace; font-size: 0.9em; }
+        .log-entry.empty { display: none; }
         .log-entry:last-child { border-bottom: none; }
         .log-timestamp { color: #94d82d; margin-right: 10px; } /* Greenish */
         .log-source { color: #5cb8e4; margin-right: 10px; } /* Light blue */
@@ -95,12 +191,12 @@ HTML_TEMPLATE = """
     </div>
 
     <div class="nav-tabs">
-        <button class="tab-button active" onclick="openTab('control')">Control</button>
-        <button class="tab-button" onclick="openTab('logs')">Live Logs</button>
-        <button class="tab-button" onclick="openTab('plugins')">Plugins</button>
+        <button class="tab-button active" data-tab="control">Control</button>
+        <button class="tab-button" data-tab="logs">Live Logs</button>
+        <button class="tab-button" data-tab="plugins">Plugins</button>
     </div>
 
-    <div id="control" class="tab-content">
+    <div id="control" class="tab-content active">
         <h2 class="section-header">Bot Control</h2>
         <div class="status-box">
             <strong>Bot Status:</strong> <span id="botStatus">Loading...</span>
@@ -117,14 +213,24 @@ HTML_TEMPLATE = """
         <!-- Add more system metrics here if needed -->
     </div>
 
-    <div id="logs" class="tab-content" style="display:none;">
+    <div id="logs" class="tab-content">
         <h2 class="section-header">Live Logs</h2>
         <div class="log-container" id="logContainer">
             <!-- Log entries will be inserted here by JavaScript -->
         </div>
+        <template id="logTpl">
+            <div class="log-entry">
+                <span class="log-timestamp"></span>
+                <span class="log-source"></span>
+                <span class="log-type"></span>
+                <span class="log-message"></span>
+                <span class="log-toggle" style="display:none;">[Details]</span>
+                <pre class="log-details"></pre>
+            </div>
+        </template>
     </div>
 
-    <div id="plugins" class="tab-content" style="display:none;">
+    <div id="plugins" class="tab-content">
         <h2 class="section-header">Plugins Overview</h2>
         <div class="plugin-list" id="pluginList">
             <!-- Plugin cards will be inserted here by JavaScript -->
@@ -145,52 +251,100 @@ HTML_TEMPLATE = """
         let currentBotStatus = 'Loading...';
         let botIsRunning = false;
 
+        // Cached formatter: building it once makes each tick noticeably
+        // cheaper than calling toLocaleString every second.
+        const timeFmt = new Intl.DateTimeFormat(undefined, { dateStyle: 'medium', timeStyle: 'medium' });
         function updateCurrentTime() {
-            const now = new Date();
-            currentTimeElem.textContent = now.toLocaleString();
+            currentTimeElem.textContent = timeFmt.format(new Date());
+        }
+        // The clock only ticks while the tab is visible; hidden tabs spend
+        // no timer wakeups on it.
+        let clockTimer = null;
+        function startClock() {
+            if (!clockTimer) {
+                clockTimer = setInterval(updateCurrentTime, 1000);
+                updateCurrentTime();
+            }
         }
-        setInterval(updateCurrentTime, 1000); // Update time every second
-        updateCurrentTime(); // Initial call
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) { clearInterval(clockTimer); clockTimer = null; }
+            else startClock();
+        });
+        startClock();
 
 
+        // NodeLists queried once; switching tabs is a class toggle, not
+        // per-click querySelectorAll walks and inline style writes.
+        const TABS = document.querySelectorAll('.tab-content');
+        const TAB_BTNS = document.querySelectorAll('.tab-button');
         function openTab(tabName) {
-            const tabs = document.querySelectorAll('.tab-content');
-            tabs.forEach(tab => tab.style.display = 'none');
-            document.getElementById(tabName).style.display = 'block';
+            TABS.forEach(tab => tab.classList.toggle('active', tab.id === tabName));
+            TAB_BTNS.forEach(btn => btn.classList.toggle('active', btn.dataset.tab === tabName));
+        }
+
+        // One delegated listener per container instead of an inline handler
+        // on every node (200 recycled log rows would mean 200 closures).
+        logContainer.addEventListener('click', e => {
+            if (e.target.classList.contains('log-toggle')) toggleLogDetails(e.target);
+        });
+        document.querySelector('.nav-tabs').addEventListener('click', e => {
+            if (e.target.dataset.tab) openTab(e.target.dataset.tab);
+        });
+
+        // A brief disconnect/reconnect flap would flicker the indicator
+        // red and back; Connected renders immediately, any other state
+        // only renders if it still holds after 2s.
+        let pendingStateTimer = null;
+        function applyBotStatus(data) {
+            if (data.status === 'Connected') {
+                if (pendingStateTimer) { clearTimeout(pendingStateTimer); pendingStateTimer = null; }
+                renderBotStatus(data);
+            } else {
+                if (pendingStateTimer) clearTimeout(pendingStateTimer);
+                pendingStateTimer = setTimeout(() => {
+                    pendingStateTimer = null;
+                    renderBotStatus(data);
+                }, 2000);
+            }
+        }
+
+        // Status -> indicator class and button wiring: exact matches first,
+        // then prefix rules, then the Error catch-all. One table lookup per
+        // update instead of a chain of string scans.
+        const STATUS_STATES = {
+            'Connected':         { cls: 'status-connected', running: true, stop: true },
+            'Disconnected':      { cls: 'status-disconnected', start: true },
+            'Stopped':           { cls: 'status-disconnected', start: true },
+            'Failed to Connect': { cls: 'status-disconnected', start: true }
+        };
+        const STATUS_PREFIXES = [
+            ['Reconnecting', { cls: 'status-connected', running: true, stop: true }],
+            ['Connecting',   { cls: 'status-connecting' }],
+            ['Starting',     { cls: 'status-connecting' }],
+            ['Stopping',     { cls: 'status-connecting' }]
+        ];
+        function resolveStatusState(s) {
+            const exact = STATUS_STATES[s];
+            if (exact) return exact;
+            const pre = STATUS_PREFIXES.find(p => s.startsWith(p[0]));
+            if (pre) return pre[1];
+            return s.includes('Error') ? { cls: 'status-error', start: true } : { cls: 'status-stopped' };
+        }
 
-            const buttons = document.querySelectorAll('.tab-button');
-            buttons.forEach(button => button.classList.remove('active'));
-            document.querySelector(`.tab-button[onclick="openTab('${tabName}')"]`).classList.add('active');
+        function renderBotStatus(data) {
+            currentBotStatus = data.status;
+            botStatusElem.textContent = currentBotStatus;
+            const st = resolveStatusState(currentBotStatus);
+            statusIndicator.className = 'status-indicator ' + st.cls;
+            botIsRunning = !!st.running;
+            startButton.disabled = !st.start;
+            stopButton.disabled = !st.stop;
         }
 
         async function fetchBotStatus() {
             try {
                 const response = await fetch('/api/status');
-                const data = await response.json();
-                currentBotStatus = data.status;
-                botStatusElem.textContent = currentBotStatus;
-                
-                statusIndicator.className = 'status-indicator';
-                startButton.disabled = true;
-                stopButton.disabled = true;
-
-                if (currentBotStatus === 'Connected' || currentBotStatus.startsWith('Reconnecting')) {
-                    statusIndicator.classList.add('status-connected');
-                    botIsRunning = true;
-                    stopButton.disabled = false;
-                } else if (currentBotStatus === 'Disconnected' || currentBotStatus === 'Stopped' || currentBotStatus === 'Failed to Connect') {
-                    statusIndicator.classList.add('status-disconnected');
-                    botIsRunning = false;
-                    startButton.disabled = false;
-                } else if (currentBotStatus.startsWith('Connecting') || currentBotStatus.startsWith('Starting') || currentBotStatus.startsWith('Stopping')) {
-                    statusIndicator.classList.add('status-connecting');
-                    botIsRunning = false; // Cannot start/stop during transition
-                } else if (currentBotStatus.includes('Error')) {
-                    statusIndicator.classList.add('status-error');
-                    botIsRunning = false;
-                    startButton.disabled = false;
-                }
-                
+                applyBotStatus(await response.json());
             } catch (error) {
                 console.error('Error fetching bot status:', error);
                 botStatusElem.textContent = 'API Error';
@@ -219,64 +373,108 @@ HTML_TEMPLATE = """
         }
 
         // --- Live Log Stream (Server-Sent Events) ---
+        // Reconnects back off exponentially with jitter (1s -> 30s cap) so a
+        // backend outage doesn't get hammered every 3s by every open tab;
+        // a successful connection resets the delay.
+        let logBackoff = 1000;
         function setupLogStream() {
             const eventSource = new EventSource('/api/logs/stream');
+            eventSource.onopen = function() { logBackoff = 1000; };
             eventSource.onmessage = function(event) {
-                const logEntry = JSON.parse(event.data);
-                appendLogEntry(logEntry);
+                // The server batches entries into one frame per debounce window.
+                JSON.parse(event.data).forEach(appendLogEntry);
             };
             eventSource.onerror = function(err) {
                 console.error("EventSource failed:", err);
                 eventSource.close();
-                // Optional: Reconnect after a delay
-                setTimeout(setupLogStream, 3000); 
+                setTimeout(setupLogStream, logBackoff + Math.random() * 500);
+                logBackoff = Math.min(logBackoff * 2, 30000);
             };
         }
 
+        const logTpl = document.getElementById('logTpl');
+
+        // Fixed pool of row nodes reused in a circle: no node creation,
+        // removal or GC per log entry, and no O(n) trim loop. The CSS
+        // 'order' property keeps newest-first without reordering the DOM.
+        const LOG_SLOTS = 200;
+        const logSlots = [];
+        let logWriteIdx = 0;
+        for (let i = 0; i < LOG_SLOTS; i++) {
+            const d = logTpl.content.firstElementChild.cloneNode(true);
+            d.classList.add('empty');
+            logContainer.appendChild(d);
+            logSlots.push(d);
+        }
+
+        // Entries arriving between frames are buffered and rendered in a
+        // single requestAnimationFrame pass: one layout/paint per frame
+        // instead of one per log event.
+        let pendingLogs = [];
+        let logFlushScheduled = false;
+
         function appendLogEntry(logEntry) {
-            const entryDiv = document.createElement('div');
-            entryDiv.className = 'log-entry';
-            
-            let fullJsonContent = '';
-            if (logEntry.full_json) {
-                try {
-                    // Try to pretty print if it's a JSON string
-                    // Ensure full_json is treated as a string before parsing
-                    const parsedJson = JSON.parse(JSON.stringify(logEntry.full_json)); 
-                    fullJsonContent = JSON.stringify(parsedJson, null, 2);
-                } catch (e) {
-                    fullJsonContent = JSON.stringify(logEntry.full_json, null, 2); // Fallback to stringify directly
-                }
+            pendingLogs.push(logEntry);
+            if (!logFlushScheduled) {
+                logFlushScheduled = true;
+                requestAnimationFrame(flushLogEntries);
             }
-            
-            entryDiv.innerHTML = `
-                <span class="log-timestamp">${logEntry.timestamp}</span>
-                <span class="log-source">[${logEntry.source}]</span>
-                <span class="log-type-${logEntry.type}">${logEntry.type}</span>
-                <span class="log-message">${logEntry.message}</span>
-                ${logEntry.full_json ? `<span class="log-toggle" onclick="toggleLogDetails(this)">[Details]</span>` : ''}
-                <pre class="log-details">${fullJsonContent}</pre>
-            `;
-            logContainer.prepend(entryDiv); // Add new logs to the top
-
-            // Limit log entries to keep performance
-            while (logContainer.children.length > 200) {
-                logContainer.removeChild(logContainer.lastChild);
+        }
+
+        function flushLogEntries() {
+            logFlushScheduled = false;
+            const batch = pendingLogs;
+            pendingLogs = [];
+            // Only the newest LOG_SLOTS entries can be visible; skip the rest.
+            if (batch.length > LOG_SLOTS) batch.splice(0, batch.length - LOG_SLOTS);
+            for (const entry of batch) renderLogEntry(entry);
+        }
+
+        function renderLogEntry(logEntry) {
+            // Assigning textContent skips the HTML parser entirely (and
+            // can't interpret log text as markup, which the old innerHTML
+            // interpolation could).
+            const entryDiv = logSlots[logWriteIdx % LOG_SLOTS];
+            entryDiv.style.order = -logWriteIdx;
+            logWriteIdx++;
+            entryDiv.classList.remove('empty', 'expanded');
+            entryDiv.querySelector('.log-timestamp').textContent = logEntry.timestamp;
+            entryDiv.querySelector('.log-source').textContent = '[' + logEntry.source + ']';
+            const typeSpan = entryDiv.querySelector('.log-type');
+            typeSpan.textContent = logEntry.type;
+            // Keep the base 'log-type' token: recycled slots are found by
+            // querySelector('.log-type'), so it must survive re-renders.
+            typeSpan.className = 'log-type log-type-' + logEntry.type;
+            entryDiv.querySelector('.log-message').textContent = logEntry.message;
+            const toggle = entryDiv.querySelector('.log-toggle');
+            const details = entryDiv.querySelector('.log-details');
+            // Serialize details lazily: most are never opened, so the
+            // stringify and its large text node wait for the first click.
+            entryDiv._rawJson = logEntry.full_json || null;
+            details.textContent = ''; // recycled slot may hold old details
+            if (logEntry.full_json) {
+                toggle.textContent = '[Details]';
+                toggle.style.display = '';
+            } else {
+                toggle.style.display = 'none';
             }
         }
 
         function toggleLogDetails(toggleElement) {
             const entryDiv = toggleElement.closest('.log-entry');
+            if (entryDiv._rawJson != null) {
+                const fj = entryDiv._rawJson;
+                entryDiv.querySelector('.log-details').textContent =
+                    (typeof fj === 'string') ? fj : JSON.stringify(fj, null, 2);
+                entryDiv._rawJson = null; // rendered once; toggling is now just CSS
+            }
             entryDiv.classList.toggle('expanded');
             toggleElement.textContent = entryDiv.classList.contains('expanded') ? '[Hide]' : '[Details]';
         }
 
-        async function fetchPluginStatuses() {
-            try {
-                const response = await fetch('/api/plugins/status');
-                const data = await response.json();
+        function renderPluginStatuses(data) {
                 pluginList.innerHTML = ''; // Clear existing list
-                
+
                 if (Object.keys(data).length === 0) {
                     pluginList.innerHTML = '<p>No plugins loaded or status unavailable.</p>';
                     return;
@@ -293,19 +491,26 @@ HTML_TEMPLATE = """
                     `;
                     pluginList.appendChild(cardDiv);
                 }
-            } catch (error) {
-                console.error('Error fetching plugin statuses:', error);
-                pluginList.innerHTML = '<p style="color:#ef5350;">Failed to load plugin statuses. API error.</p>';
-            }
         }
 
-        // --- Periodically update status and plugins ---
-        setInterval(fetchBotStatus, 3000); // Update bot status every 3 seconds
-        setInterval(fetchPluginStatuses, 5000); // Update plugin status every 5 seconds
+        // --- Status push (Server-Sent Events) ---
+        // The server emits 'status' and 'plugins' frames only when state
+        // actually changes, so no polling timers are needed.
+        let statusBackoff = 1000;
+        function setupEventStream() {
+            const es = new EventSource('/api/events/stream');
+            es.onopen = function() { statusBackoff = 1000; };
+            es.addEventListener('status', e => applyBotStatus(JSON.parse(e.data)));
+            es.addEventListener('plugins', e => renderPluginStatuses(JSON.parse(e.data)));
+            es.onerror = function() {
+                es.close();
+                setTimeout(setupEventStream, statusBackoff + Math.random() * 500);
+                statusBackoff = Math.min(statusBackoff * 2, 30000);
+            };
+        }
 
         // Initial calls
-        fetchBotStatus();
-        fetchPluginStatuses();
+        setupEventStream();
         setupLogStream();
         openTab('control'); // Open control tab by default
 
@@ -491,4 +696,224 @@ feature_data is CRITICAL.
 
 It stores dynamic data for all plugins.
 
-Example structu
+Example structure:
+
+{
+  "economy": { "bank": 1200 },
+  "wordgame": { "wins": 4, "streak": 2 }
+}
+
+Each plugin reads and writes ONLY its own key.
+
+==================================================
+5. plugins_loader.py (PLUGIN LOADER)
+==================================================
+
+- Discover plugins/*.py
+- Import each module
+- Call setup(engine)
+- One broken plugin must NOT stop the others
+- Report per-plugin status to the UI
+
+==================================================
+6. ui.py (CONTROL PANEL)
+==================================================
+
+- Serve the dashboard page
+- Bot status + start/stop control
+- Live log stream (Server-Sent Events)
+- Plugin status overview
+
+==================================================
+7. requirements.txt
+==================================================
+
+Exact dependency list. Nothing undeclared.
+
+END OF DOCUMENT.
+`;
+            navigator.clipboard.writeText(promptText).then(() => {
+                alert('System prompt copied to clipboard!');
+            }).catch(err => {
+                console.error('Failed to copy prompt:', err);
+            });
+        }
+    </script>
+</body>
+</html>
+"""
+
+
+# The page has no template variables, so rendering it through Jinja per
+# request would just re-parse the same ~30KB string; serve the bytes.
+# Compressed variants are built once here, never per request.
+_PAGE = HTML_TEMPLATE.encode('utf-8')
+_PAGE_GZ = gzip.compress(_PAGE, 9)
+_PAGE_BR = brotli.compress(_PAGE, quality=11) if brotli is not None else None
+
+
+# --- Flask Routes ---
+
+@app.route('/')
+def index():
+    accept = request.headers.get('Accept-Encoding', '')
+    if _PAGE_BR is not None and 'br' in accept:
+        body, encoding = _PAGE_BR, 'br'
+    elif 'gzip' in accept:
+        body, encoding = _PAGE_GZ, 'gzip'
+    else:
+        return Response(_PAGE, mimetype='text/html')
+    return Response(body, mimetype='text/html',
+                    headers={'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'})
+
+
+@app.route('/api/status')
+def api_status():
+    status = _bot_engine_ref.get_current_status() if _bot_engine_ref else "Stopped"
+    return Response(_json_bytes({"status": status}), mimetype='application/json')
+
+
+@app.route('/api/control/<action>', methods=['POST'])
+def api_control(action):
+    if _bot_engine_ref is None:
+        return jsonify({"message": "Bot engine not initialized."}), 503
+    if action == 'start':
+        if _bot_engine_ref._bot_running:
+            return jsonify({"message": "Bot is already running."})
+        # run() exits once stop() flips these flags, so a restart resets
+        # them and relaunches the loop on a fresh thread.
+        _bot_engine_ref._bot_running = True
+        _bot_engine_ref._stop_event.clear()
+        threading.Thread(target=_bot_engine_ref.run, daemon=True).start()
+        return jsonify({"message": "Bot start requested."})
+    if action == 'stop':
+        _bot_engine_ref.stop()
+        return jsonify({"message": "Bot stop requested."})
+    return jsonify({"message": f"Unknown action: {action}"}), 400
+
+
+# Each SSE frame carries up to _SSE_MAX_BATCH log entries collected over at
+# most _SSE_DEBOUNCE_S seconds; a full batch flushes immediately.
+_SSE_DEBOUNCE_S = 0.075
+_SSE_MAX_BATCH = 50
+
+# ui_log_active must stay set while ANY client is streaming, so track a
+# count rather than letting the last-closed stream clear it for everyone.
+_log_clients = 0
+_log_clients_lock = threading.Lock()
+
+
+@app.route('/api/logs/stream')
+def api_logs_stream():
+    def generate():
+        global _log_clients
+        # Tell the engine someone is watching so it builds info-level
+        # entries again; cleared when the last client goes away.
+        with _log_clients_lock:
+            _log_clients += 1
+            ui_log_active.set()
+        try:
+            # Start with the recent backlog (at most what the UI displays).
+            cursor = max(0, ui_log_queue.pos - 200)
+            while True:
+                # Sleep at kernel level until the producer notifies; an idle
+                # stream wakes only for the periodic keepalive comment.
+                cursor, batch = ui_log_queue.read_since(cursor, timeout=25)
+                if not batch:
+                    yield b': keepalive\n\n'
+                    continue
+                # Debounce: collect whatever else lands within the window so
+                # a log storm becomes one SSE frame (and one DOM update
+                # client-side) instead of dozens per second.
+                deadline = time.monotonic() + _SSE_DEBOUNCE_S
+                while len(batch) < _SSE_MAX_BATCH:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    cursor, more = ui_log_queue.read_since(cursor, timeout=remaining)
+                    if not more:
+                        break
+                    batch.extend(more)
+                yield b"data: " + _json_bytes(batch) + b"\n\n"
+        finally:
+            with _log_clients_lock:
+                _log_clients -= 1
+                if _log_clients == 0:
+                    ui_log_active.clear()
+    return Response(generate(), mimetype='text/event-stream')
+
+
+def _status_frame():
+    status = _bot_engine_ref.get_current_status() if _bot_engine_ref else "Stopped"
+    return b"event: status\ndata: " + _json_bytes({'status': status}) + b"\n\n"
+
+
+def _plugins_frame():
+    statuses = _plugin_loader_ref.get_statuses() if _plugin_loader_ref else {}
+    return b"event: plugins\ndata: " + _json_bytes(statuses) + b"\n\n"
+
+
+@app.route('/api/events/stream')
+def api_events_stream():
+    """Pushes bot and plugin status over SSE so clients don't have to poll;
+    frames only go out when the corresponding signal actually fires. Each
+    client tracks its own generations, so any number of tabs see every
+    transition."""
+    def generate():
+        # Current state first, so a fresh tab renders immediately.
+        status_gen = bot_status_event.gen
+        plugins_gen = plugins_status_event.gen
+        yield _status_frame()
+        yield _plugins_frame()
+        idle = 0.0
+        while True:
+            pushed = False
+            new_gen = bot_status_event.wait_changed(status_gen, timeout=2)
+            if new_gen != status_gen:
+                status_gen = new_gen
+                yield _status_frame()
+                pushed = True
+            new_gen = plugins_status_event.gen
+            if new_gen != plugins_gen:
+                plugins_gen = new_gen
+                yield _plugins_frame()
+                pushed = True
+            idle = 0.0 if pushed else idle + 2
+            if idle >= 24:
+                idle = 0.0
+                yield b': keepalive\n\n'
+    return Response(generate(), mimetype='text/event-stream')
+
+
+# Serialized plugin-status response, rebuilt only when the loader signals a
+# change; steady-state polls get a 0-byte 304 against the cached ETag.
+_plugins_cache = {"etag": None, "body": b"{}", "gen": -1}
+
+
+def _plugins_status_cache():
+    gen = plugins_status_event.gen
+    if _plugins_cache["gen"] != gen:
+        statuses = _plugin_loader_ref.get_statuses() if _plugin_loader_ref else {}
+        body = _json_bytes(statuses)
+        _plugins_cache["body"] = body
+        _plugins_cache["etag"] = hashlib.md5(body).hexdigest()
+        _plugins_cache["gen"] = gen
+    return _plugins_cache
+
+
+@app.route('/api/plugins/status')
+def api_plugins_status():
+    cache = _plugins_status_cache()
+    if request.headers.get('If-None-Match') == cache["etag"]:
+        return '', 304
+    return Response(cache["body"], mimetype='application/json',
+                    headers={'ETag': cache["etag"]})
+
+
+def start_ui_server(bot_engine, plugin_loader, port):
+    """Runs the Flask control panel (blocking; called from the main thread)."""
+    global _bot_engine_ref, _plugin_loader_ref
+    _bot_engine_ref = bot_engine
+    _plugin_loader_ref = plugin_loader
+    ui_logger.info("UI server listening on port %s", port)
+    app.run(host='0.0.0.0', port=port, threaded=True)